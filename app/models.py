@@ -69,3 +69,51 @@ class Incident(db.Model):
             'mitigation_steps': self.mitigation_steps,
             'prevention_measures': self.prevention_measures
         }
+
+class IncidentRevision(db.Model):
+    """
+    Append-only revision of an incident.
+
+    Every revision stores only the fields that changed. Creates, baselines
+    and every SNAPSHOT_INTERVAL-th revision (starting with the first) also
+    store the full incident state, so any revision can be rebuilt from at
+    most SNAPSHOT_INTERVAL records.
+    """
+    __tablename__ = 'incident_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('incident_id', 'revision', name='uq_incident_revision'),
+        {'mysql_charset': 'utf8mb4'}
+    )
+
+    SNAPSHOT_INTERVAL = 10
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: history outlives hard-deleted incidents
+    incident_id = db.Column(db.Integer, nullable=False, index=True)
+    revision = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # baseline, create, update, delete
+    changes = db.Column(db.JSON, nullable=False)  # Changed fields only (empty on create)
+    # Full state, on snapshot revisions only; SQL NULL (not JSON null) otherwise
+    snapshot = db.Column(db.JSON(none_as_null=True))
+    changed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<IncidentRevision {self.incident_id}@{self.revision}>"
+
+    @classmethod
+    def snapshot_revision(cls, revision):
+        """Return the nearest snapshot revision at or before `revision`."""
+        return ((revision - 1) // cls.SNAPSHOT_INTERVAL) * cls.SNAPSHOT_INTERVAL + 1
+
+    def to_dict(self):
+        """Convert revision to dictionary for JSON serialization."""
+        # Create and baseline revisions store their fields in the snapshot only
+        changes = self.snapshot if self.action in ('create', 'baseline') else self.changes
+        return {
+            'revision': self.revision,
+            'action': self.action,
+            'changes': changes,
+            'changed_by': self.changed_by,
+            'changed_at': self.changed_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
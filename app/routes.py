@@ -1,10 +1,17 @@
 from flask import Blueprint, request, jsonify, current_app
 from app import db
-from app.models import Incident, User
-from app.utils import validate_incident_data
+from app.models import Incident, IncidentRevision, User
+from app.utils import (
+    validate_incident_data, parse_aggregate_query, build_aggregate_query,
+    aggregate_cache_key, aggregate_cache, parse_datetime, record_revision,
+    reconstruct_incident, lock_incident, is_revision_conflict, suggest_index,
+    SUGGEST_FIELDS, incident_filter_conditions, validate_bulk_update,
+    record_bulk_revisions, BULK_MAX_INCIDENTS
+)
 from sqlalchemy.exc import IntegrityError
 from flask_login import login_required, current_user
 from functools import wraps
+from datetime import datetime
 import re
 
 # Create a Blueprint for the routes
@@ -29,11 +36,15 @@ def home():
         'endpoints': {
             'GET /incidents': 'Get all incidents (with pagination and filtering)',
             'POST /incidents': 'Create a new incident',
-            'GET /incidents/{id}': 'Get a specific incident',
+            'GET /incidents/{id}': 'Get a specific incident (optionally ?as_of=<datetime>)',
+            'GET /incidents/{id}/history': 'Get the revision history of an incident',
             'PUT /incidents/{id}': 'Update an incident',
+            'PATCH /incidents/bulk': 'Update status, assignee or resolution notes of many incidents',
             'DELETE /incidents/{id}': 'Delete an incident',
             'GET /incidents/search': 'Search incidents',
-            'GET /incidents/stats': 'Get incident statistics'
+            'GET /incidents/suggest': 'Autocomplete tags, categories or titles by prefix',
+            'GET /incidents/stats': 'Get incident statistics',
+            'GET /incidents/aggregate': 'Aggregate incidents by dimensions with filters'
         }
     }), 200
 
@@ -45,19 +56,9 @@ def get_all_incidents():
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
-    status = request.args.get('status')
-    severity = request.args.get('severity')
-    category = request.args.get('category')
     
-    query = Incident.query
-    
-    # Apply filters
-    if status:
-        query = query.filter(Incident.status == status)
-    if severity:
-        query = query.filter(Incident.severity == severity)
-    if category:
-        query = query.filter(Incident.category == category)
+    # Apply filters (status, severity, category)
+    query = Incident.query.filter(*incident_filter_conditions(request.args))
     
     # Order by most recent first
     query = query.order_by(Incident.reported_at.desc())
@@ -94,6 +95,34 @@ def search_incidents():
     
     return jsonify([incident.to_dict() for incident in search_results]), 200
 
+@api.route('/incidents/suggest', methods=['GET'])
+@login_required
+def suggest_incident_values():
+    """
+    Autocomplete tags, categories or titles from an in-memory prefix index.
+    Example: /incidents/suggest?field=tag&prefix=saf&limit=10
+    """
+    field = request.args.get('field', '')
+    prefix = request.args.get('prefix', '')
+    limit = request.args.get('limit', 10, type=int)
+
+    if field not in SUGGEST_FIELDS:
+        return jsonify({'error': f'Field must be one of: {", ".join(SUGGEST_FIELDS)}'}), 400
+    if len(prefix) > 200:
+        return jsonify({'error': 'Prefix must be 200 characters or less'}), 400
+    if not 1 <= limit <= 50:
+        return jsonify({'error': 'Limit must be between 1 and 50'}), 400
+
+    suggestions = suggest_index.suggest(field, prefix, limit)
+
+    return jsonify({
+        'field': field,
+        'prefix': prefix,
+        'suggestions': [
+            {'value': value, 'count': count} for value, count in suggestions
+        ]
+    }), 200
+
 @api.route('/incidents/stats', methods=['GET'])
 @login_required
 def get_incident_stats():
@@ -118,6 +147,33 @@ def get_incident_stats():
         'by_category': dict(by_category)
     }), 200
 
+@api.route('/incidents/aggregate', methods=['GET'])
+@login_required
+def aggregate_incidents():
+    """
+    Aggregate incidents with a single GROUP BY over the requested dimensions.
+    Example: /incidents/aggregate?group_by=category,severity&status=open&from=2025-04-01
+    """
+    params = parse_aggregate_query(request.args)
+    if not params['valid']:
+        return jsonify({'error': params['message']}), 400
+
+    key = aggregate_cache_key(params)
+    results = aggregate_cache.get(key)
+    if results is None:
+        results = [
+            dict(zip(params['group_by'] + ['count'], row))
+            for row in build_aggregate_query(params).all()
+        ]
+        aggregate_cache.set(key, results)
+
+    return jsonify({
+        'group_by': params['group_by'],
+        'metric': params['metric'],
+        'results': results,
+        'total': sum(row['count'] for row in results)
+    }), 200
+
 @api.route('/incidents', methods=['POST'])
 @login_required
 def create_incident():
@@ -144,7 +200,11 @@ def create_incident():
         )
         
         db.session.add(new_incident)
+        db.session.flush()
+        record_revision(new_incident, 'create', changed_by=current_user.id)
         db.session.commit()
+        aggregate_cache.clear()
+        suggest_index.index_incident(new_incident.to_dict())
         
         return jsonify(new_incident.to_dict()), 201
     except IntegrityError as e:
@@ -155,8 +215,19 @@ def create_incident():
 @login_required
 def get_incident(incident_id):
     """
-    Retrieve a specific incident by ID.
+    Retrieve a specific incident by ID, or its state at ?as_of=<datetime>.
     """
+    as_of = request.args.get('as_of')
+    if as_of:
+        try:
+            as_of = parse_datetime(as_of)
+        except ValueError:
+            return jsonify({'error': 'as_of must be an ISO 8601 date or datetime'}), 400
+        state = reconstruct_incident(incident_id, as_of)
+        if state is None:
+            return jsonify({'error': 'Incident not found at that time'}), 404
+        return jsonify(state), 200
+
     incident = Incident.query.get(incident_id)
     
     if not incident:
@@ -164,13 +235,32 @@ def get_incident(incident_id):
     
     return jsonify(incident.to_dict()), 200
 
+@api.route('/incidents/<int:incident_id>/history', methods=['GET'])
+@login_required
+def get_incident_history(incident_id):
+    """
+    Retrieve the revision history of an incident, oldest first.
+    History is kept for deleted incidents as well.
+    """
+    revisions = IncidentRevision.query.filter_by(
+        incident_id=incident_id
+    ).order_by(IncidentRevision.revision).all()
+
+    if not revisions:
+        return jsonify({'error': 'No history found for this incident'}), 404
+
+    return jsonify({
+        'incident_id': incident_id,
+        'revisions': [revision.to_dict() for revision in revisions]
+    }), 200
+
 @api.route('/incidents/<int:incident_id>', methods=['PUT'])
 @login_required
 def update_incident(incident_id):
     """
     Update an existing incident.
     """
-    incident = Incident.query.get(incident_id)
+    incident = lock_incident(incident_id)
     if not incident:
         return jsonify({'error': 'Incident not found'}), 404
     
@@ -179,6 +269,7 @@ def update_incident(incident_id):
         return jsonify({'error': 'Unauthorized to update this incident'}), 403
     
     data = request.get_json()
+    previous = incident.to_dict()
     
     # Update fields if provided
     if 'title' in data:
@@ -206,9 +297,100 @@ def update_incident(incident_id):
     if 'prevention_measures' in data:
         incident.prevention_measures = data['prevention_measures']
     
-    db.session.commit()
+    try:
+        db.session.flush()
+        record_revision(incident, 'update', changed_by=current_user.id, previous=previous)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_revision_conflict(e):
+            return jsonify({'error': 'Incident was modified concurrently, please retry'}), 409
+        return jsonify({'error': 'Database integrity error', 'details': str(e)}), 400
+    aggregate_cache.clear()
+    suggest_index.unindex_incident(previous)
+    suggest_index.index_incident(incident.to_dict())
     return jsonify(incident.to_dict()), 200
 
+@api.route('/incidents/bulk', methods=['PATCH'])
+@login_required
+def bulk_update_incidents():
+    """
+    Apply status, assigned_to or resolution_notes changes to many incidents
+    in one set-based UPDATE. Incidents are selected by `ids` or by the same
+    `filters` as GET /incidents. Non-admins only update incidents they
+    reported; the rule is part of the UPDATE's WHERE clause.
+    """
+    data = request.get_json(silent=True)
+    validation_result = validate_bulk_update(data)
+    if not validation_result['valid']:
+        return jsonify({'error': validation_result['message']}), 400
+
+    if data.get('ids') is not None:
+        selection = [Incident.id.in_(data['ids'])]
+    else:
+        selection = incident_filter_conditions(data['filters'])
+    if not selection:
+        return jsonify({'error': 'Selection must not match every incident'}), 400
+    permission = [] if current_user.is_admin else [Incident.reported_by == current_user.id]
+    changes = data['changes']
+    # Leave out rows that already have the requested values
+    differs = db.or_(*[getattr(Incident, field).is_distinct_from(value)
+                       for field, value in changes.items()])
+
+    try:
+        # Lock the selection, reading one row past the cap to detect overflow.
+        # All counts come from these locked rows, so they agree with the UPDATE.
+        rows = db.session.execute(
+            db.select(
+                Incident.id,
+                db.case((db.and_(db.true(), *permission), True), else_=False).label('permitted'),
+                db.case((differs, True), else_=False).label('differs'),
+                *[getattr(Incident, field) for field in changes]
+            )
+            .where(*selection)
+            .limit(BULK_MAX_INCIDENTS + 1)
+            .with_for_update()
+        ).all()
+        if len(rows) > BULK_MAX_INCIDENTS:
+            db.session.rollback()
+            return jsonify({
+                'error': f'Selection matches more than {BULK_MAX_INCIDENTS} incidents; '
+                         f'at most {BULK_MAX_INCIDENTS} can be updated per request'
+            }), 400
+        matched = len(rows)
+        permitted = sum(1 for row in rows if row.permitted)
+
+        # Prior values of the rows to change, for the history
+        previous_values = {
+            row.id: {field: getattr(row, field) for field in changes}
+            for row in rows if row.permitted and row.differs
+        }
+
+        updated_at = datetime.utcnow()
+        result = db.session.execute(
+            db.update(Incident)
+            .where(*selection, *permission, differs)
+            .values(**changes, updated_at=updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        record_bulk_revisions(previous_values, changes, updated_at, changed_by=current_user.id)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_revision_conflict(e):
+            return jsonify({'error': 'Incidents were modified concurrently, please retry'}), 409
+        return jsonify({'error': 'Database integrity error', 'details': str(e)}), 400
+
+    # Bulk fields are not autocompleted, so only the aggregate cache is stale
+    aggregate_cache.clear()
+
+    return jsonify({
+        'matched': matched,
+        'updated': result.rowcount,
+        'unchanged': permitted - result.rowcount,
+        'forbidden': matched - permitted
+    }), 200
+
 @api.route('/incidents/<int:incident_id>', methods=['DELETE'])
 @login_required
 @admin_required
@@ -216,12 +398,22 @@ def delete_incident(incident_id):
     """
     Delete an incident by ID (admin only).
     """
-    incident = Incident.query.get(incident_id)
+    incident = lock_incident(incident_id)
     
     if not incident:
         return jsonify({'error': 'Incident not found'}), 404
     
-    db.session.delete(incident)
-    db.session.commit()
+    previous = incident.to_dict()
+    try:
+        record_revision(incident, 'delete', changed_by=current_user.id)
+        db.session.delete(incident)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_revision_conflict(e):
+            return jsonify({'error': 'Incident was modified concurrently, please retry'}), 409
+        return jsonify({'error': 'Database integrity error', 'details': str(e)}), 400
+    aggregate_cache.clear()
+    suggest_index.unindex_incident(previous)
     
     return jsonify({'message': 'Incident deleted successfully'}), 200
@@ -1,6 +1,23 @@
 from app import db
-from app.models import Incident
-from datetime import datetime
+from app.models import Incident, IncidentRevision
+from datetime import datetime, timezone
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+import heapq
+import threading
+import time
+
+# Columns that may be used as GROUP BY dimensions or equality filters
+AGGREGATE_DIMENSIONS = ['category', 'severity', 'status', 'assigned_to', 'reported_by']
+AGGREGATE_METRICS = ['count']
+
+# Fields served by the autocomplete index
+SUGGEST_FIELDS = ['tag', 'category', 'title']
+
+# Filters shared by incident listing and bulk updates
+INCIDENT_FILTERS = ['status', 'severity', 'category']
+BULK_UPDATE_FIELDS = ['status', 'assigned_to', 'resolution_notes']
+BULK_MAX_INCIDENTS = 1000  # Per bulk request, by ids or by filters
 
 def validate_incident_data(data):
     """
@@ -79,6 +96,532 @@ def validate_incident_data(data):
         'message': 'Data is valid'
     }
 
+def incident_filter_conditions(filters):
+    """
+    Build SQL conditions for the incident list filters (status, severity,
+    category) from a mapping such as request.args.
+    """
+    return [
+        getattr(Incident, name) == filters[name]
+        for name in INCIDENT_FILTERS if filters.get(name)
+    ]
+
+def is_integer(value):
+    """Return True for JSON integers, which excludes booleans."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_bulk_update(data):
+    """
+    Validate a bulk update request: a selection (`ids` or `filters`) and
+    the `changes` to apply.
+    """
+    valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
+
+    if not isinstance(data, dict):
+        return {'valid': False, 'message': 'Request body must be a JSON object'}
+
+    ids, filters = data.get('ids'), data.get('filters')
+    if (ids is None) == (filters is None):
+        return {'valid': False, 'message': 'Provide exactly one of: ids, filters'}
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(is_integer(i) for i in ids):
+            return {'valid': False, 'message': 'ids must be a non-empty list of integers'}
+        if len(ids) > BULK_MAX_INCIDENTS:
+            return {'valid': False, 'message': f'At most {BULK_MAX_INCIDENTS} ids per request'}
+    if filters is not None:
+        if not isinstance(filters, dict) or not filters:
+            return {'valid': False, 'message': 'filters must be a non-empty object'}
+        for name, value in filters.items():
+            if name not in INCIDENT_FILTERS:
+                return {
+                    'valid': False,
+                    'message': f'Filters must be among: {", ".join(INCIDENT_FILTERS)}'
+                }
+            if not isinstance(value, str) or not value:
+                return {'valid': False, 'message': f'Filter {name} must be a non-empty string'}
+
+    changes = data.get('changes')
+    if not isinstance(changes, dict) or not changes:
+        return {'valid': False, 'message': 'changes must be a non-empty object'}
+    for field in changes:
+        if field not in BULK_UPDATE_FIELDS:
+            return {
+                'valid': False,
+                'message': f'Only these fields can be changed in bulk: {", ".join(BULK_UPDATE_FIELDS)}'
+            }
+    if 'status' in changes and changes['status'] not in valid_statuses:
+        return {
+            'valid': False,
+            'message': f'Status must be one of: {", ".join(valid_statuses)}'
+        }
+    if 'assigned_to' in changes and changes['assigned_to'] is not None \
+            and not is_integer(changes['assigned_to']):
+        return {'valid': False, 'message': 'assigned_to must be a user id or null'}
+    if 'resolution_notes' in changes and changes['resolution_notes'] is not None \
+            and not isinstance(changes['resolution_notes'], str):
+        return {'valid': False, 'message': 'resolution_notes must be a string or null'}
+
+    return {
+        'valid': True,
+        'message': 'Data is valid'
+    }
+
+def parse_datetime(value):
+    """
+    Parse an ISO 8601 date or datetime into a naive UTC datetime, the
+    form timestamps are stored in. Raises ValueError on bad input.
+    """
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_aggregate_query(args):
+    """
+    Validate and normalize the query string of an aggregation request.
+    Dimensions are deduplicated and put in canonical order so equivalent
+    requests share a cache key.
+    """
+    group_by = [d.strip() for d in args.get('group_by', '').split(',') if d.strip()]
+    if not group_by:
+        return {
+            'valid': False,
+            'message': 'At least one group_by dimension is required'
+        }
+    for dimension in group_by:
+        if dimension not in AGGREGATE_DIMENSIONS:
+            return {
+                'valid': False,
+                'message': f'group_by must be one of: {", ".join(AGGREGATE_DIMENSIONS)}'
+            }
+    group_by = [d for d in AGGREGATE_DIMENSIONS if d in group_by]
+
+    metric = args.get('metric', 'count')
+    if metric not in AGGREGATE_METRICS:
+        return {
+            'valid': False,
+            'message': f'Metric must be one of: {", ".join(AGGREGATE_METRICS)}'
+        }
+
+    filters = {}
+    for dimension in AGGREGATE_DIMENSIONS:
+        value = args.get(dimension)
+        if value is None or value == '':
+            continue
+        if dimension in ('assigned_to', 'reported_by'):
+            # isdigit() alone accepts characters such as '²' that int() rejects
+            if not (value.isascii() and value.isdigit()):
+                return {
+                    'valid': False,
+                    'message': f'{dimension} must be a user id'
+                }
+            value = int(value)
+        filters[dimension] = value
+
+    date_range = {}
+    for bound in ('from', 'to'):
+        value = args.get(bound)
+        if not value:
+            continue
+        try:
+            date_range[bound] = parse_datetime(value)
+        except ValueError:
+            return {
+                'valid': False,
+                'message': f'{bound} must be an ISO 8601 date or datetime'
+            }
+
+    return {
+        'valid': True,
+        'message': 'Query is valid',
+        'group_by': group_by,
+        'metric': metric,
+        'filters': filters,
+        'from': date_range.get('from'),
+        'to': date_range.get('to')
+    }
+
+def build_aggregate_query(params):
+    """
+    Compile a normalized aggregation request into a single GROUP BY query.
+    The reported_at range is half-open: from <= reported_at < to.
+    """
+    columns = [getattr(Incident, d) for d in params['group_by']]
+    query = db.session.query(*columns, db.func.count(Incident.id).label('count'))
+
+    for dimension, value in params['filters'].items():
+        query = query.filter(getattr(Incident, dimension) == value)
+    if params['from']:
+        query = query.filter(Incident.reported_at >= params['from'])
+    if params['to']:
+        query = query.filter(Incident.reported_at < params['to'])
+
+    return query.group_by(*columns).order_by(db.func.count(Incident.id).desc())
+
+def aggregate_cache_key(params):
+    """Build a hashable cache key from a normalized aggregation request."""
+    return (
+        tuple(params['group_by']),
+        params['metric'],
+        tuple(sorted(params['filters'].items())),
+        params['from'],
+        params['to']
+    )
+
+class QueryCache:
+    """
+    Small in-process cache for query results.
+
+    Entries expire after `ttl` seconds and the whole cache is cleared on
+    writes in this process. The TTL bounds staleness across server
+    workers, which each hold their own cache.
+    """
+
+    def __init__(self, ttl=30, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Evict the entry closest to expiry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+aggregate_cache = QueryCache()
+
+def record_revision(incident, action, changed_by=None, previous=None):
+    """
+    Append a revision for an incident to the current session.
+    `previous` is the incident's to_dict() before the change; only fields
+    that differ from it are stored. Returns None if nothing changed.
+    Call after flushing so generated values (id, updated_at) are set, and
+    with the incident row locked (see lock_incident) for update and delete.
+    """
+    state = incident.to_dict()
+    if action == 'delete' or previous is None:
+        # Create revisions keep the full state in the snapshot only
+        changes = {}
+    else:
+        changes = {k: v for k, v in state.items() if previous.get(k) != v}
+        if not changes or list(changes) == ['updated_at']:
+            return None
+
+    last_revision = db.select(IncidentRevision.revision).where(
+        IncidentRevision.incident_id == incident.id
+    ).order_by(IncidentRevision.revision.desc()).limit(1)
+    if action != 'create':
+        # Locking read: under REPEATABLE READ a plain read could return a
+        # stale snapshot and hand out a revision number another writer just
+        # used. Creates use a plain read instead: a locking read that finds
+        # no rows takes a gap lock, and concurrent creates would deadlock
+        # on it. Nobody else can write history for an uncommitted incident;
+        # rows found belong to a deleted incident whose id was reused.
+        last_revision = last_revision.with_for_update()
+    # Plain Core select as the caller has already flushed
+    with db.session.no_autoflush:
+        revision = (db.session.execute(last_revision).scalar() or 0) + 1
+
+    entry = IncidentRevision(
+        incident_id=incident.id,
+        revision=revision,
+        action=action,
+        changes=changes,
+        changed_by=changed_by
+    )
+    if action == 'create' or IncidentRevision.snapshot_revision(revision) == revision:
+        entry.snapshot = state
+    db.session.add(entry)
+    return entry
+
+def is_revision_conflict(error):
+    """Return True if an IntegrityError came from a duplicate revision number."""
+    return 'uq_incident_revision' in str(error.orig)
+
+def lock_incident(incident_id):
+    """
+    Load an incident with its row locked until the end of the transaction,
+    so concurrent writers of the same incident are serialized.
+    """
+    return Incident.query.filter_by(id=incident_id).with_for_update().populate_existing().first()
+
+def create_baseline_revisions(batch_size=500):
+    """
+    Write a baseline snapshot revision for every incident without history,
+    e.g. incidents created before revisions were recorded. The baseline is
+    dated at the incident's last update, so point-in-time reads work from
+    then on. Returns the number of incidents baselined.
+    """
+    has_history = db.exists().where(IncidentRevision.incident_id == Incident.id)
+    total = 0
+    while True:
+        incidents = Incident.query.filter(~has_history).order_by(Incident.id).limit(batch_size).all()
+        if not incidents:
+            return total
+        db.session.execute(db.insert(IncidentRevision), [
+            {
+                'incident_id': incident.id,
+                'revision': 1,
+                'action': 'baseline',
+                'changes': {},
+                'snapshot': incident.to_dict(),
+                'changed_at': incident.updated_at or incident.reported_at
+            }
+            for incident in incidents
+        ])
+        db.session.commit()
+        total += len(incidents)
+
+def record_bulk_revisions(previous_values, changes, updated_at, changed_by=None):
+    """
+    Append one update revision per incident after a set-based UPDATE.
+    `previous_values` maps incident id to the values of the changed fields
+    before the update. Revision numbers come from one grouped, locking MAX
+    query; full states are loaded only for incidents due a snapshot; all
+    rows are written in a single executemany.
+    """
+    if not previous_values:
+        return
+
+    # Locking read, see record_revision
+    last_revisions = dict(db.session.execute(
+        db.select(IncidentRevision.incident_id, db.func.max(IncidentRevision.revision))
+        .where(IncidentRevision.incident_id.in_(list(previous_values)))
+        .group_by(IncidentRevision.incident_id)
+        .with_for_update()
+    ).all())
+    revisions = {
+        incident_id: (last_revisions.get(incident_id) or 0) + 1
+        for incident_id in previous_values
+    }
+
+    # The UPDATE has already run, so these rows hold the new state
+    snapshot_ids = [
+        incident_id for incident_id, revision in revisions.items()
+        if IncidentRevision.snapshot_revision(revision) == revision
+    ]
+    snapshots = {}
+    if snapshot_ids:
+        snapshots = {
+            incident.id: incident.to_dict()
+            for incident in Incident.query.filter(Incident.id.in_(snapshot_ids)).populate_existing()
+        }
+
+    rows = []
+    for incident_id, previous in previous_values.items():
+        delta = {k: v for k, v in changes.items() if previous[k] != v}
+        delta['updated_at'] = updated_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+        rows.append({
+            'incident_id': incident_id,
+            'revision': revisions[incident_id],
+            'action': 'update',
+            'changes': delta,
+            'snapshot': snapshots.get(incident_id),
+            'changed_by': changed_by,
+            'changed_at': updated_at
+        })
+    db.session.execute(db.insert(IncidentRevision), rows)
+
+def reconstruct_incident(incident_id, as_of):
+    """
+    Rebuild an incident as it was at `as_of` from its revision history.
+    Reads one window of at most SNAPSHOT_INTERVAL revisions and replays the
+    deltas after the latest full state in it (a create, baseline or
+    periodic snapshot). Returns None if the incident did not exist then.
+    """
+    target = IncidentRevision.query.filter(
+        IncidentRevision.incident_id == incident_id,
+        IncidentRevision.changed_at <= as_of
+    ).order_by(IncidentRevision.revision.desc()).first()
+    if target is None or target.action == 'delete':
+        return None
+
+    # The periodic snapshot guarantees a full state within this window
+    revisions = IncidentRevision.query.filter(
+        IncidentRevision.incident_id == incident_id,
+        IncidentRevision.revision.between(
+            IncidentRevision.snapshot_revision(target.revision), target.revision
+        )
+    ).order_by(IncidentRevision.revision).all()
+    starts = [i for i, entry in enumerate(revisions) if entry.snapshot is not None]
+    if not starts:
+        return None
+
+    state = dict(revisions[starts[-1]].snapshot)
+    for entry in revisions[starts[-1] + 1:]:
+        state.update(entry.changes)
+    state['revision'] = target.revision
+    return state
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix index over a bag of terms, ranked by frequency.
+
+    Terms are kept in a sorted array so a prefix maps to a contiguous
+    range found by binary search. At most `max_terms` distinct terms are
+    held; when full, a new term only replaces a term seen once. Results for
+    prefixes shorter than SHORT_PREFIX characters span large ranges and
+    are cached until the next change.
+    """
+
+    SHORT_PREFIX = 2
+    MAX_LIMIT = 50
+
+    def __init__(self, max_terms=5000):
+        self.max_terms = max_terms
+        self._keys = []  # Sorted lowercase terms
+        self._terms = {}  # lowercase term -> [display value, count]
+        self._short = {}  # Ranked results for prefixes that match wide ranges
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self, values):
+        """Replace the contents with the most frequent `max_terms` values."""
+        counts = Counter()
+        display = {}
+        for value in values:
+            key = value.lower()
+            counts[key] += 1
+            display.setdefault(key, value)
+        self._terms = {
+            key: [display[key], count]
+            for key, count in counts.most_common(self.max_terms)
+        }
+        self._keys = sorted(self._terms)
+        self._short.clear()
+
+    def add(self, value):
+        key = value.lower()
+        self._short.clear()
+        entry = self._terms.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return
+        if len(self._keys) >= self.max_terms:
+            evicted = min(self._terms, key=lambda k: self._terms[k][1])
+            if self._terms[evicted][1] > 1:
+                # Every held term is more frequent than the newcomer; it is
+                # picked up by the next rebuild if it becomes common
+                return
+            del self._terms[evicted]
+            del self._keys[bisect_left(self._keys, evicted)]
+        self._terms[key] = [value, 1]
+        insort(self._keys, key)
+
+    def remove(self, value):
+        key = value.lower()
+        entry = self._terms.get(key)
+        if entry is None:
+            return
+        self._short.clear()
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._terms[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def search(self, prefix, limit=10):
+        """Return up to `limit` (value, count) pairs starting with `prefix`."""
+        prefix = prefix.lower()
+        if len(prefix) < self.SHORT_PREFIX and limit <= self.MAX_LIMIT:
+            if prefix not in self._short:
+                self._short[prefix] = self._rank(prefix, self.MAX_LIMIT)
+            return self._short[prefix][:limit]
+        return self._rank(prefix, limit)
+
+    def _rank(self, prefix, limit):
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_right(self._keys, prefix + '\U0010ffff', lo)
+        best = heapq.nsmallest(
+            limit, self._keys[lo:hi],
+            key=lambda k: (-self._terms[k][1], k)
+        )
+        return [tuple(self._terms[k]) for k in best]
+
+class SuggestIndex:
+    """
+    Lazily built per-field autocomplete indexes for incidents.
+
+    Each field is loaded from the database on first use and then kept
+    current from the incident write paths in this process. Indexes are
+    rebuilt after `ttl` seconds so writes handled by other server
+    workers are picked up.
+    """
+
+    def __init__(self, max_terms=5000, ttl=300):
+        self.max_terms = max_terms
+        self.ttl = ttl
+        self._indexes = {}  # field -> (built_at, PrefixIndex)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _values(field, incident):
+        """Extract the indexed values of a field from an incident's to_dict()."""
+        if field == 'tag':
+            return [tag.strip() for tag in incident.get('tags') or [] if tag.strip()]
+        value = incident.get(field)
+        return [value] if value else []
+
+    def _load(self, field):
+        if field == 'tag':
+            values = []
+            for (tags,) in db.session.query(Incident.tags).filter(Incident.tags.isnot(None)):
+                values.extend(tag.strip() for tag in tags.split(',') if tag.strip())
+        else:
+            column = getattr(Incident, field)
+            values = [value for (value,) in db.session.query(column) if value]
+        index = PrefixIndex(self.max_terms)
+        index.build(values)
+        return index
+
+    def suggest(self, field, prefix, limit=10):
+        with self._lock:
+            entry = self._indexes.get(field)
+            if entry is None or entry[0] + self.ttl < time.monotonic():
+                entry = (time.monotonic(), self._load(field))
+                self._indexes[field] = entry
+            return entry[1].search(prefix, limit)
+
+    def index_incident(self, incident):
+        """Add an incident (as returned by to_dict) to every built index."""
+        with self._lock:
+            for field, (_, index) in self._indexes.items():
+                for value in self._values(field, incident):
+                    index.add(value)
+
+    def unindex_incident(self, incident):
+        """Remove an incident (as returned by to_dict) from every built index."""
+        with self._lock:
+            for field, (_, index) in self._indexes.items():
+                for value in self._values(field, incident):
+                    index.remove(value)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+suggest_index = SuggestIndex()
+
 def format_error_response(error_message, status_code=400):
     """
     Format an error response in a consistent way.
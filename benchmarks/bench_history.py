@@ -0,0 +1,79 @@
+"""
+Measure the write overhead of revision history on the incident update path.
+
+Runs the same sequence of updates through the test client with revision
+recording disabled and enabled, against an in-memory SQLite database.
+
+Usage:
+    python benchmarks/bench_history.py [--updates N] [--rounds N]
+"""
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_login import LoginManager
+
+from app import create_app, db
+from app.models import User, Incident
+
+
+def run(updates, record):
+    app = create_app('testing')
+    login_manager = LoginManager(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', is_admin=True)
+        user.set_password('bench')
+        incident = Incident(title='Bench', description='Bench', severity='low', category='bench')
+        db.session.add_all([user, incident])
+        db.session.commit()
+        user_id, incident_id = user.id, incident.id
+
+    @login_manager.request_loader
+    def load_user(request):
+        return db.session.get(User, user_id)
+
+    client = app.test_client()
+    patch = mock.patch('app.routes.record_revision', return_value=None)
+    if not record:
+        patch.start()
+    try:
+        start = time.perf_counter()
+        for i in range(updates):
+            client.put(f'/incidents/{incident_id}', json={
+                'status': 'in_progress' if i % 2 else 'open',
+                'resolution_notes': f'Note {i}'
+            })
+        return (time.perf_counter() - start) / updates
+    finally:
+        if not record:
+            patch.stop()
+        with app.app_context():
+            db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    run(200, record=True)  # Warm up
+    # Interleave rounds and keep the best of each to reduce noise
+    baseline, with_history = float('inf'), float('inf')
+    for _ in range(args.rounds):
+        baseline = min(baseline, run(args.updates, record=False))
+        with_history = min(with_history, run(args.updates, record=True))
+
+    print(f'without history: {baseline * 1e6:.0f}us per update')
+    print(f'with history:    {with_history * 1e6:.0f}us per update')
+    print(f'overhead:        {(with_history / baseline - 1) * 100:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark the production server: cold start time and steady-state throughput.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app`, measures the time until the
+home endpoint answers, then issues requests from a pool of client threads.
+
+Usage:
+    python benchmarks/bench_server.py [--workers N] [--requests N] [--concurrency N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(url, timeout=30):
+    """Poll the URL until it answers; return the elapsed time in seconds."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Server did not become ready within {timeout}s')
+
+
+def fetch(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=10) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_load(url, total, concurrency):
+    """Issue `total` requests with `concurrency` clients; return (rps, latencies)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: fetch(url), range(total)))
+    return total / (time.perf_counter() - start), sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    env = dict(os.environ, BIND=f'127.0.0.1:{args.port}', LOG_LEVEL='warning')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    url = f'http://127.0.0.1:{args.port}/'
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', 'wsgi:app'],
+        cwd=ROOT, env=env
+    )
+    try:
+        cold_start = wait_until_ready(url)
+        # Warm up every worker before measuring
+        run_load(url, 200, args.concurrency)
+        rps, latencies = run_load(url, args.requests, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'workers:     {env.get("WEB_CONCURRENCY", "auto")}')
+    print(f'cold start:  {cold_start:.2f}s')
+    print(f'throughput:  {rps:.0f} req/s ({args.requests} requests, {args.concurrency} clients)')
+    print(f'latency:     p50 {p50:.2f}ms, p99 {p99:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
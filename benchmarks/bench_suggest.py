@@ -0,0 +1,66 @@
+"""
+Measure prefix index build time, memory footprint and lookup latency.
+
+Builds a PrefixIndex from synthetic terms with a skewed frequency
+distribution and times lookups for prefixes of increasing length.
+
+Usage:
+    python benchmarks/bench_suggest.py [--terms N] [--max-terms N]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import PrefixIndex
+
+
+def random_term(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 16)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--terms', type=int, default=20000)
+    parser.add_argument('--max-terms', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [random_term(rng) for _ in range(args.terms)]
+    # Zipf-like usage: low-ranked terms appear far more often
+    weights = [1 / (rank + 1) for rank in range(args.terms)]
+    values = rng.choices(vocabulary, weights=weights, k=args.terms * 5)
+
+    index = PrefixIndex(args.max_terms)
+    start = time.perf_counter()
+    index.build(values)
+    build_time = time.perf_counter() - start
+
+    size = sys.getsizeof(index._keys) + sys.getsizeof(index._terms)
+    size += sum(sys.getsizeof(k) * 2 + 120 for k in index._keys)
+
+    print(f'build:   {len(values)} values -> {len(index)} terms in {build_time * 1000:.1f}ms, ~{size / 1024:.0f}KiB')
+    for length in range(0, 4):
+        prefixes = [''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+                    for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            index.search(prefix, 10)
+        elapsed = (time.perf_counter() - start) / args.lookups
+        print(f'lookup:  prefix length {length}: {elapsed * 1e6:.1f}us')
+
+    start = time.perf_counter()
+    for value in values[:args.lookups]:
+        index.remove(value)
+        index.add(value)
+    elapsed = (time.perf_counter() - start) / args.lookups
+    print(f'update:  remove + add: {elapsed * 1e6:.1f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+
+# Server socket
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Worker processes; defaults to (2 x cores) + 1
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'sync'
+timeout = int(os.getenv('WORKER_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', 100))
+
+# Import the application once in the master before forking workers
+preload_app = True
+
+# Logging
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """
+    Drop any database connections inherited from the master process.
+    Sockets must never be shared between processes, so each worker
+    starts with an empty pool and opens its own connections.
+    """
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,19 +1,21 @@
 
 import pymysql
 from app import create_app, db
-from app.utils import populate_sample_data
+from config import Config
+from app.utils import populate_sample_data, create_baseline_revisions
 
 def init_database():
     # Create the database if it doesn't exist
     conn = pymysql.connect(
-        host='localhost',
-        user='root',
-        password='pramod2805'
+        host=Config.DB_HOST,
+        port=int(Config.DB_PORT),
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD
     )
     
     try:
         with conn.cursor() as cursor:
-            cursor.execute("CREATE DATABASE IF NOT EXISTS AI_Safety_Incident_Log_Service")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{Config.DB_NAME}`")
         print("Database created successfully or already exists")
     except Exception as e:
         print(f"Error creating database: {e}")
@@ -27,6 +29,7 @@ def init_database():
     with app.app_context():
         db.create_all()
         populate_sample_data()
+        create_baseline_revisions()
         print("✅  Database tables created and sample data populated.")
 
 if __name__ == "__main__":
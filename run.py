@@ -1,6 +1,6 @@
 from app import create_app, db
 from app.models import User, Incident
-from app.utils import populate_sample_data
+from app.utils import populate_sample_data, create_baseline_revisions
 import os
 import sys
 
@@ -11,7 +11,7 @@ def init_db():
     try:
         with app.app_context():
             db.create_all()
-            
+
             # Create admin user if it doesn't exist
             admin = User.query.filter_by(username='admin').first()
             if not admin:
@@ -24,21 +24,48 @@ def init_db():
                 db.session.add(admin)
                 db.session.commit()
                 print("Admin user created successfully!")
-            
+
             # Populate sample data
             populate_sample_data()
+
+            # Give incidents without history a baseline revision
+            baselined = create_baseline_revisions()
+            if baselined:
+                print(f"Baseline history created for {baselined} incidents.")
             print("Database initialized successfully!")
     except Exception as e:
         print(f"Error initializing database: {str(e)}")
         sys.exit(1)
 
-if __name__ == '__main__':
-    # Initialize database
-    init_db()
-    
-    # Run the application
+def serve():
+    """Run the production server (multi-worker gunicorn, see gunicorn.conf.py)."""
+    root = os.path.dirname(os.path.abspath(__file__))
     try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
-    except Exception as e:
-        print(f"Error starting the application: {str(e)}")
+        os.execvp('gunicorn', [
+            'gunicorn',
+            '--config', os.path.join(root, 'gunicorn.conf.py'),
+            '--chdir', root,
+            'wsgi:app'
+        ])
+    except OSError as e:
+        print(f"Error starting the production server: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'dev'
+
+    if command == 'migrate':
+        # Create tables, admin user and sample data (run once per deploy)
+        init_db()
+    elif command == 'serve':
+        serve()
+    elif command == 'dev':
+        # Run the development server
+        try:
+            app.run(debug=True, host='0.0.0.0', port=5000)
+        except Exception as e:
+            print(f"Error starting the application: {str(e)}")
+            sys.exit(1)
+    else:
+        print("Usage: python run.py [dev|migrate|serve]")
         sys.exit(1)
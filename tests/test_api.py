@@ -1,7 +1,10 @@
 import unittest
 import json
+from flask import g
+from flask_login import LoginManager
 from app import create_app, db
-from app.models import User, Incident
+from app.models import User, Incident, IncidentRevision
+from app.utils import aggregate_cache, suggest_index, create_baseline_revisions, PrefixIndex
 from datetime import datetime
 
 class TestAPI(unittest.TestCase):
@@ -23,19 +26,30 @@ class TestAPI(unittest.TestCase):
         db.session.add(self.test_user)
         db.session.commit()
         
-        # Login and get token
-        response = self.client.post('/auth/login', json={
-            'username': 'testuser',
-            'password': 'testpass123'
-        })
-        self.token = response.json['token']
-        self.headers = {'Authorization': f'Bearer {self.token}'}
+        # The app has no login endpoint yet, so authenticate requests with a
+        # stub loader that treats the bearer token as a user id
+        login_manager = LoginManager(self.app)
+
+        @login_manager.request_loader
+        def load_user_from_request(req):
+            token = req.headers.get('Authorization', '').replace('Bearer ', '')
+            return db.session.get(User, int(token)) if token.isdigit() else None
+
+        # The pushed app context is reused by every request; drop the cached user
+        self.app.before_request(lambda: g.pop('_login_user', None) and None)
+        self.headers = self.auth_headers(self.test_user)
+
+    def auth_headers(self, user):
+        """Return request headers authenticating as the given user."""
+        return {'Authorization': f'Bearer {user.id}'}
 
     def tearDown(self):
         """Clean up after each test."""
         db.session.remove()
         db.drop_all()
         self.app_context.pop()
+        aggregate_cache.clear()
+        suggest_index.clear()
 
     def test_home_endpoint(self):
         """Test the home endpoint."""
@@ -116,6 +130,40 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['title'], 'Security Breach')
 
+    def test_suggest_incidents(self):
+        """Test autocompleting tags by prefix, ranked by frequency."""
+        for tags in ['safety,sandbox', 'safety', 'bias']:
+            incident = Incident(
+                title='Test incident',
+                description='Test description',
+                severity='low',
+                category='test',
+                tags=tags,
+                reported_by=self.test_user.id
+            )
+            db.session.add(incident)
+        db.session.commit()
+
+        response = self.client.get('/incidents/suggest?field=tag&prefix=Sa', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['suggestions'], [
+            {'value': 'safety', 'count': 2},
+            {'value': 'sandbox', 'count': 1}
+        ])
+
+        # New incidents are indexed incrementally
+        self.client.post('/incidents', json={
+            'title': 'Sabotage',
+            'description': 'Test description',
+            'severity': 'low',
+            'category': 'test',
+            'tags': ['sabotage']
+        }, headers=self.headers)
+        response = self.client.get('/incidents/suggest?field=tag&prefix=sab', headers=self.headers)
+        data = json.loads(response.data)
+        self.assertEqual(data['suggestions'], [{'value': 'sabotage', 'count': 1}])
+
     def test_incident_stats(self):
         """Test getting incident statistics."""
         # Create test incidents with different severities
@@ -137,6 +185,46 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data['total_incidents'], 4)
         self.assertEqual(len(data['by_severity']), 4)
 
+    def test_aggregate_incidents(self):
+        """Test aggregating incidents by multiple dimensions with filters."""
+        for category, severity, status in [
+            ('bias', 'high', 'open'),
+            ('bias', 'high', 'open'),
+            ('bias', 'low', 'resolved'),
+            ('privacy', 'critical', 'open')
+        ]:
+            incident = Incident(
+                title=f'Test {category}',
+                description='Test description',
+                severity=severity,
+                status=status,
+                category=category,
+                reported_by=self.test_user.id
+            )
+            db.session.add(incident)
+        db.session.commit()
+
+        response = self.client.get(
+            '/incidents/aggregate?group_by=severity,category&status=open',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['group_by'], ['category', 'severity'])
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['results'][0], {'category': 'bias', 'severity': 'high', 'count': 2})
+
+        # Unknown dimensions are rejected
+        response = self.client.get('/incidents/aggregate?group_by=title', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        # User id filters must be plain ASCII digits
+        response = self.client.get(
+            '/incidents/aggregate?group_by=status&assigned_to=%C2%B2',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_update_incident(self):
         """Test updating an incident."""
         # Create test incident
@@ -168,5 +256,208 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data['severity'], 'high')
         self.assertEqual(data['status'], 'in_progress')
 
+    def test_bulk_update_incidents(self):
+        """Test updating many incidents at once by filter and by id."""
+        other_user = User(username='otheruser', email='other@example.com')
+        other_user.set_password('otherpass123')
+        db.session.add(other_user)
+        db.session.commit()
+        for i in range(6):
+            incident = Incident(
+                title=f'Test Incident {i}',
+                description='Test description',
+                severity='high' if i % 2 else 'low',
+                category='test',
+                reported_by=self.test_user.id if i < 4 else other_user.id
+            )
+            db.session.add(incident)
+        db.session.commit()
+
+        response = self.client.patch('/incidents/bulk', json={
+            'filters': {'severity': 'high'},
+            'changes': {'status': 'resolved', 'resolution_notes': 'Fixed by rollback'}
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data, {'matched': 3, 'updated': 3, 'unchanged': 0, 'forbidden': 0})
+
+        response = self.client.get('/incidents?status=resolved', headers=self.headers)
+        self.assertEqual(json.loads(response.data)['total'], 3)
+
+        incident_ids = [incident.id for incident in Incident.query.filter_by(severity='low')]
+        response = self.client.patch('/incidents/bulk', json={
+            'ids': incident_ids,
+            'changes': {'assigned_to': other_user.id}
+        }, headers=self.headers)
+        self.assertEqual(json.loads(response.data)['updated'], 3)
+        self.assertEqual(Incident.query.filter_by(assigned_to=other_user.id).count(), 3)
+
+        # Only the bulk-updatable fields are accepted
+        response = self.client.patch('/incidents/bulk', json={
+            'ids': incident_ids,
+            'changes': {'title': 'New title'}
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        # Repeating a change leaves rows and their history untouched
+        response = self.client.patch('/incidents/bulk', json={
+            'filters': {'severity': 'high'},
+            'changes': {'status': 'resolved'}
+        }, headers=self.headers)
+        data = json.loads(response.data)
+        self.assertEqual(data, {'matched': 3, 'updated': 0, 'unchanged': 3, 'forbidden': 0})
+        self.assertEqual(IncidentRevision.query.count(), 6)
+
+    def test_bulk_update_rejects_empty_selection(self):
+        """Test that filters without a usable value cannot select every incident."""
+        for i in range(3):
+            incident = Incident(
+                title=f'Test Incident {i}',
+                description='Test description',
+                severity='low',
+                category='test',
+                reported_by=self.test_user.id
+            )
+            db.session.add(incident)
+        db.session.commit()
+
+        for filters in [{'status': ''}, {'status': None}, {'category': 5}]:
+            response = self.client.patch('/incidents/bulk', json={
+                'filters': filters,
+                'changes': {'status': 'closed'}
+            }, headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch('/incidents/bulk', json={
+            'ids': [True],
+            'changes': {'status': 'closed'}
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Incident.query.filter_by(status='closed').count(), 0)
+
+        # An explicit null id list falls back to the filters
+        response = self.client.patch('/incidents/bulk', json={
+            'ids': None,
+            'filters': {'status': 'open'},
+            'changes': {'status': 'closed'}
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['updated'], 3)
+
+    def test_incident_history(self):
+        """Test revision history and point-in-time reads of an incident."""
+        response = self.client.post('/incidents', json={
+            'title': 'Original Title',
+            'description': 'Original description',
+            'severity': 'low',
+            'category': 'test'
+        }, headers=self.headers)
+        incident_id = json.loads(response.data)['id']
+        for status in ['in_progress', 'resolved']:
+            self.client.put(
+                f'/incidents/{incident_id}',
+                json={'status': status},
+                headers=self.headers
+            )
+
+        response = self.client.get(f'/incidents/{incident_id}/history', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        revisions = json.loads(response.data)['revisions']
+        self.assertEqual([r['action'] for r in revisions], ['create', 'update', 'update'])
+        self.assertEqual(revisions[1]['changes']['status'], 'in_progress')
+        self.assertNotIn('title', revisions[1]['changes'])
+
+        # Move the first update back in time and read the incident as of then
+        revision = IncidentRevision.query.filter_by(incident_id=incident_id, revision=2).first()
+        revision.changed_at = datetime(2025, 1, 1)
+        IncidentRevision.query.filter_by(incident_id=incident_id, revision=1).first().changed_at = datetime(2024, 1, 1)
+        db.session.commit()
+        response = self.client.get(
+            f'/incidents/{incident_id}?as_of=2025-06-01',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'in_progress')
+        self.assertEqual(data['revision'], 2)
+
+    def test_incident_history_compact_and_baseline(self):
+        """Test that creates store one copy of the state and baselines cover old incidents."""
+        response = self.client.post('/incidents', json={
+            'title': 'New incident',
+            'description': 'Test description',
+            'severity': 'low',
+            'category': 'test'
+        }, headers=self.headers)
+        incident_id = json.loads(response.data)['id']
+        revision = IncidentRevision.query.filter_by(incident_id=incident_id).one()
+        self.assertEqual(revision.changes, {})
+        self.assertEqual(revision.snapshot['title'], 'New incident')
+
+        # Incidents inserted without going through the API have no history
+        legacy = Incident(
+            title='Legacy incident',
+            description='Test description',
+            severity='high',
+            category='test',
+            reported_by=self.test_user.id,
+            reported_at=datetime(2024, 1, 1),
+            updated_at=datetime(2024, 2, 1)
+        )
+        db.session.add(legacy)
+        db.session.commit()
+        self.assertEqual(create_baseline_revisions(), 1)
+        self.assertEqual(create_baseline_revisions(), 0)
+
+        response = self.client.get(f'/incidents/{legacy.id}?as_of=2024-03-01', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['title'], 'Legacy incident')
+        response = self.client.get(f'/incidents/{legacy.id}?as_of=2024-01-15', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_incident_history_with_reused_id(self):
+        """Test that a new incident reusing a deleted incident's id starts from its own state."""
+        incident_data = {
+            'description': 'Test description',
+            'severity': 'low',
+            'category': 'test'
+        }
+        response = self.client.post('/incidents', json=dict(incident_data, title='Old incident'),
+                                    headers=self.headers)
+        incident_id = json.loads(response.data)['id']
+        self.client.put(f'/incidents/{incident_id}', json={'status': 'in_progress'},
+                        headers=self.headers)
+        self.client.delete(f'/incidents/{incident_id}', headers=self.headers)
+
+        # SQLite hands out the highest deleted id again
+        response = self.client.post('/incidents', json=dict(incident_data, title='New incident'),
+                                    headers=self.headers)
+        self.assertEqual(json.loads(response.data)['id'], incident_id)
+
+        response = self.client.get(f'/incidents/{incident_id}/history', headers=self.headers)
+        revisions = json.loads(response.data)['revisions']
+        self.assertEqual([r['action'] for r in revisions], ['create', 'update', 'delete', 'create'])
+        self.assertEqual(revisions[-1]['changes']['title'], 'New incident')
+
+        response = self.client.get(f'/incidents/{incident_id}?as_of=2100-01-01', headers=self.headers)
+        data = json.loads(response.data)
+        self.assertEqual(data['title'], 'New incident')
+        self.assertEqual(data['status'], 'open')
+
+class TestPrefixIndex(unittest.TestCase):
+    def test_eviction_keeps_frequent_terms(self):
+        """Test that a full index never evicts a term more frequent than the new one."""
+        index = PrefixIndex(max_terms=2)
+        index.build(['x', 'x', 'y', 'y'])
+        index.add('z')
+        self.assertEqual(index.search(''), [('x', 2), ('y', 2)])
+
+        # A term seen once is replaced by a newcomer
+        index.remove('y')
+        index.remove('y')
+        index.add('w')
+        index.add('z')
+        self.assertEqual(index.search(''), [('x', 2), ('z', 1)])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+
+from app import create_app
+
+# WSGI entry point used by the production server (see gunicorn.conf.py).
+# The application is created once in the master process and shared with
+# the workers through fork. FLASK_CONFIG defaults to production here.
+app = create_app(os.getenv('FLASK_CONFIG', 'production'))